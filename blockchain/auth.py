@@ -1,52 +1,105 @@
 import hashlib
+import hmac
 import json
 import os
 import secrets
+import sqlite3
 from typing import Dict, Any, Tuple, Optional
 
+# scrypt cost parameters; n is tunable to match the hardware budget
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
 class UserAuth:
     def __init__(self, storage_path: str = "storage"):
         self.storage_path = storage_path
         self.users_file = os.path.join(storage_path, "users.json")
         self.sessions_file = os.path.join(storage_path, "sessions.json")
+        self.db_file = os.path.join(storage_path, "auth.sqlite")
         os.makedirs(storage_path, exist_ok=True)
+        self._db = self._open_db()
         self.users = self._load_users()
+        self._users_by_id = {user_data["user_id"]: user_data
+                             for user_data in self.users.values()}
         self.sessions = self._load_sessions()
 
+    def _open_db(self) -> sqlite3.Connection:
+        """Open the auth database, creating tables if needed."""
+        db = sqlite3.connect(self.db_file, isolation_level=None,
+                             check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS users "
+                   "(username TEXT PRIMARY KEY, data TEXT)")
+        db.execute("CREATE TABLE IF NOT EXISTS sessions "
+                   "(token TEXT PRIMARY KEY, user_id TEXT, username TEXT)")
+        return db
+
     def _load_users(self) -> Dict[str, Any]:
-        """Load users from file."""
+        """Load users from the database, migrating any legacy JSON file."""
+        rows = self._db.execute("SELECT username, data FROM users").fetchall()
+        if rows:
+            return {username: json.loads(data) for username, data in rows}
+
+        # One-time migration from the old users.json format
         if os.path.exists(self.users_file):
             with open(self.users_file, 'r') as f:
-                return json.load(f)
+                users = json.load(f)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO users (username, data) VALUES (?, ?)",
+                [(username, json.dumps(data)) for username, data in users.items()])
+            return users
         return {}
 
-    def _save_users(self) -> None:
-        """Save users to file."""
-        with open(self.users_file, 'w') as f:
-            json.dump(self.users, f, indent=2)
+    def _save_user(self, username: str, user_data: Dict[str, Any]) -> None:
+        """Persist a single user record."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO users (username, data) VALUES (?, ?)",
+            (username, json.dumps(user_data)))
 
     def _load_sessions(self) -> Dict[str, Any]:
-        """Load sessions from file."""
+        """Load sessions from the database, migrating any legacy JSON file."""
+        rows = self._db.execute(
+            "SELECT token, user_id, username FROM sessions").fetchall()
+        if rows:
+            return {token: {"user_id": user_id, "username": username}
+                    for token, user_id, username in rows}
+
+        # One-time migration from the old sessions.json format
         if os.path.exists(self.sessions_file):
             with open(self.sessions_file, 'r') as f:
-                return json.load(f)
+                sessions = json.load(f)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sessions (token, user_id, username) "
+                "VALUES (?, ?, ?)",
+                [(token, data["user_id"], data["username"])
+                 for token, data in sessions.items()])
+            return sessions
         return {}
 
-    def _save_sessions(self) -> None:
-        """Save sessions to file."""
-        with open(self.sessions_file, 'w') as f:
-            json.dump(self.sessions, f, indent=2)
-
     def _hash_password(self, password: str, salt: str = None) -> Tuple[str, str]:
-        """Hash a password with a salt."""
+        """Hash a password with a salt using scrypt."""
         if salt is None:
             salt = secrets.token_hex(16)
-        
-        hash_obj = hashlib.sha256((password + salt).encode())
-        hashed_password = hash_obj.hexdigest()
-        
+
+        hashed_password = hashlib.scrypt(
+            password.encode(), salt=bytes.fromhex(salt),
+            n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=32).hex()
+
         return hashed_password, salt
 
+    def _verify_password(self, password: str, user_data: Dict[str, Any]) -> bool:
+        """Check a password against a stored hash in constant time."""
+        if user_data.get("scheme") == "scrypt":
+            hashed_password, _ = self._hash_password(password, user_data["salt"])
+        else:
+            # Legacy single-round SHA-256 records predate the scrypt scheme
+            hashed_password = hashlib.sha256(
+                (password + user_data["salt"]).encode()).hexdigest()
+
+        return hmac.compare_digest(hashed_password, user_data["hashed_password"])
+
     def register_user(self, username: str, password: str, email: str) -> Dict[str, Any]:
         """Register a new user."""
         if username in self.users:
@@ -62,12 +115,14 @@ class UserAuth:
             "email": email,
             "hashed_password": hashed_password,
             "salt": salt,
+            "scheme": "scrypt",
             "role": "user"
         }
         
         self.users[username] = user_data
-        self._save_users()
-        
+        self._users_by_id[user_id] = user_data
+        self._save_user(username, user_data)
+
         return user_data
 
     def login(self, username: str, password: str) -> Optional[str]:
@@ -76,9 +131,7 @@ class UserAuth:
             return None
         
         user_data = self.users[username]
-        hashed_password, _ = self._hash_password(password, user_data["salt"])
-        
-        if hashed_password != user_data["hashed_password"]:
+        if not self._verify_password(password, user_data):
             return None
         
         # Create a new session
@@ -87,15 +140,19 @@ class UserAuth:
             "user_id": user_data["user_id"],
             "username": username
         }
-        self._save_sessions()
-        
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions (token, user_id, username) "
+            "VALUES (?, ?, ?)",
+            (session_token, user_data["user_id"], username))
+
         return session_token
 
     def logout(self, session_token: str) -> bool:
         """Logout a user by invalidating their session token."""
         if session_token in self.sessions:
             del self.sessions[session_token]
-            self._save_sessions()
+            self._db.execute("DELETE FROM sessions WHERE token = ?",
+                             (session_token,))
             return True
         return False
 
@@ -114,10 +171,7 @@ class UserAuth:
 
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user data by user ID."""
-        for username, user_data in self.users.items():
-            if user_data["user_id"] == user_id:
-                return user_data
-        return None
+        return self._users_by_id.get(user_id)
 
     def change_password(self, username: str, old_password: str, new_password: str) -> bool:
         """Change a user's password."""
@@ -125,17 +179,16 @@ class UserAuth:
             return False
         
         user_data = self.users[username]
-        hashed_old_password, _ = self._hash_password(old_password, user_data["salt"])
-        
-        if hashed_old_password != user_data["hashed_password"]:
+        if not self._verify_password(old_password, user_data):
             return False
-        
+
         hashed_new_password, salt = self._hash_password(new_password)
-        
+
         user_data["hashed_password"] = hashed_new_password
         user_data["salt"] = salt
+        user_data["scheme"] = "scrypt"
         
         self.users[username] = user_data
-        self._save_users()
-        
+        self._save_user(username, user_data)
+
         return True
\ No newline at end of file
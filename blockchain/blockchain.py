@@ -1,20 +1,89 @@
 import hashlib
 import json
+import os
+import struct
+import sys
+import threading
 import time
-from typing import List, Dict, Any
+
+import msgpack
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple
+
+# Below this many blocks, sequential validation beats the thread-pool
+# setup cost.
+PARALLEL_VALIDATION_THRESHOLD = 64
+
+def _intern_transaction(transaction: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a transaction whose keys and type value are interned.
+
+    Every transaction repeats the same handful of key strings and a small
+    set of type values; decoding a long chain otherwise materializes a
+    fresh str object for each. Interning collapses them to one object
+    apiece, shrinking the loaded chain and turning later comparisons into
+    pointer checks.
+    """
+    interned = {sys.intern(key): value for key, value in transaction.items()}
+    transaction_type = interned.get("type")
+    if isinstance(transaction_type, str):
+        interned["type"] = sys.intern(transaction_type)
+    return interned
 
 class Block:
-    def __init__(self, index: int, timestamp: float, transactions: List[Dict[str, Any]], 
-                 previous_hash: str):
+    def __init__(self, index: int, timestamp: float, transactions: List[Dict[str, Any]],
+                 previous_hash: str, compute_hash: bool = True):
         self.index = index
         self.timestamp = timestamp
         self.transactions = transactions
         self.previous_hash = previous_hash
         self.nonce = 0
-        self.hash = self.calculate_hash()
+        self._prefix_bytes = None
+        # Columnar views of the transactions: index rebuilds walk these
+        # contiguous lists instead of chasing a dict lookup per transaction
+        self.tx_user_ids = [transaction.get("user_id") for transaction in transactions]
+        self.tx_doc_hashes = [transaction.get("document_hash") for transaction in transactions]
+        # Callers reloading a stored block pass compute_hash=False and
+        # assign the persisted nonce and hash instead
+        self.hash = self.calculate_hash() if compute_hash else ""
+
+    def _get_prefix_bytes(self) -> bytes:
+        """Get the canonical binary block header without the nonce, cached.
+
+        Everything except the nonce is static while mining, so it is
+        serialized once and only the nonce bytes change per attempt. Fixed
+        fields are packed with struct and transactions with msgpack, which
+        is cheaper than a sorted JSON dump and needs no key ordering pass.
+        """
+        if self._prefix_bytes is None:
+            try:
+                previous_hash = bytes.fromhex(self.previous_hash)
+            except ValueError:
+                # The genesis block uses a non-hex placeholder
+                previous_hash = self.previous_hash.encode()
+            self._prefix_bytes = (
+                struct.pack('>Qd', self.index, self.timestamp)
+                + previous_hash
+                + msgpack.packb(self.transactions, use_bin_type=True)
+            )
+        return self._prefix_bytes
+
+    def _calculate_digest(self) -> bytes:
+        """Calculate the raw SHA-256 digest of the block."""
+        block_bytes = self._get_prefix_bytes() + struct.pack('>Q', self.nonce)
+        return hashlib.sha256(block_bytes).digest()
 
     def calculate_hash(self) -> str:
         """Calculate the hash of the block."""
+        return self._calculate_digest().hex()
+
+    def calculate_legacy_hash(self) -> str:
+        """Calculate the block hash under the original sorted-JSON scheme.
+
+        Chains mined before the switch to the binary header carry hashes
+        computed this way; validation accepts either so those deployments
+        stay valid.
+        """
         block_string = json.dumps({
             "index": self.index,
             "timestamp": self.timestamp,
@@ -22,15 +91,27 @@ class Block:
             "previous_hash": self.previous_hash,
             "nonce": self.nonce
         }, sort_keys=True).encode()
-        
         return hashlib.sha256(block_string).hexdigest()
 
     def mine_block(self, difficulty: int) -> None:
         """Mine a new block."""
-        target = "0" * difficulty
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
+        # Difficulty 0 means proof-of-work is disabled; any hash qualifies
+        if difficulty <= 0:
             self.hash = self.calculate_hash()
+            return
+        # A hash meets the difficulty when its first `difficulty` hex digits
+        # are zero, i.e. the top 4*difficulty bits of the digest are zero.
+        # Comparing raw bytes as an integer avoids hex-encoding and slicing
+        # a string on every attempt.
+        shift = 64 - 4 * difficulty
+        prefix = self._get_prefix_bytes()
+        while True:
+            candidate = prefix + struct.pack('>Q', self.nonce)
+            digest = hashlib.sha256(candidate).digest()
+            if int.from_bytes(digest[:8], 'big') >> shift == 0:
+                break
+            self.nonce += 1
+        self.hash = digest.hex()
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert block to dictionary."""
@@ -48,6 +129,29 @@ class Blockchain:
         self.chain = [self.create_genesis_block()]
         self.difficulty = 2
         self.pending_transactions = []
+        self._user_tx_index = defaultdict(list)
+        self._doc_tx_index = defaultdict(list)
+        self._hash_index = {self.chain[0].hash: self.chain[0]}
+        # Single worker so mined blocks append in submission order. All
+        # chain writes funnel through it, so readers never need a lock:
+        # the chain is append-only and a reader either sees a new block or
+        # the still-consistent prefix before it.
+        self._miner = ThreadPoolExecutor(max_workers=1)
+        # Guards pending_transactions against the miner thread
+        self._pending_lock = threading.Lock()
+        # Orders the append and index update of a mined block so readers
+        # never observe an indexed-but-unappended block
+        self._chain_lock = threading.Lock()
+
+    def _index_block(self, block: Block) -> None:
+        """Add a block's transactions to the lookup indexes."""
+        self._hash_index[block.hash] = block
+        for transaction, user_id, document_hash in zip(
+                block.transactions, block.tx_user_ids, block.tx_doc_hashes):
+            if user_id is not None:
+                self._user_tx_index[user_id].append((block, transaction))
+            if document_hash is not None:
+                self._doc_tx_index[document_hash].append((block, transaction))
 
     def create_genesis_block(self) -> Block:
         """Create the genesis block."""
@@ -67,31 +171,61 @@ class Blockchain:
             previous_hash=latest_block.hash
         )
         new_block.mine_block(self.difficulty)
-        self.chain.append(new_block)
+        with self._chain_lock:
+            self.chain.append(new_block)
+            self._index_block(new_block)
         return new_block
 
     def add_transaction(self, transaction: Dict[str, Any]) -> int:
         """Add a new transaction to pending transactions."""
-        self.pending_transactions.append(transaction)
+        with self._pending_lock:
+            self.pending_transactions.append(transaction)
         return self.get_latest_block().index + 1
 
+    def _drain_pending_transactions(self) -> List[Dict[str, Any]]:
+        """Atomically take everything from the pending queue."""
+        with self._pending_lock:
+            transactions = self.pending_transactions
+            self.pending_transactions = []
+        return transactions
+
     def mine_pending_transactions(self) -> Block:
         """Mine pending transactions into a new block."""
-        if not self.pending_transactions:
+        transactions = self._drain_pending_transactions()
+        if not transactions:
             return None
-            
-        new_block = self.add_block(self.pending_transactions)
-        self.pending_transactions = []
+
+        return self.add_block(transactions)
+
+    def _mine_transactions(self, transactions: List[Dict[str, Any]],
+                           on_mined) -> Block:
+        """Worker job: mine a block and run the completion callback."""
+        new_block = self.add_block(transactions)
+        if on_mined is not None:
+            on_mined(new_block)
         return new_block
 
-    def is_chain_valid(self) -> bool:
-        """Validate the entire blockchain."""
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i-1]
+    def mine_pending_transactions_async(self, on_mined=None):
+        """Mine pending transactions on the background worker thread.
+
+        Returns a Future resolving to the mined block, or None if there was
+        nothing to mine. SHA-256 releases the GIL, so proof-of-work runs
+        concurrently with the caller instead of blocking it.
+        """
+        transactions = self._drain_pending_transactions()
+        if not transactions:
+            return None
+
+        return self._miner.submit(self._mine_transactions, transactions, on_mined)
 
-            # Check if the hash is correct
-            if current_block.hash != current_block.calculate_hash():
+    @staticmethod
+    def _validate_pairs(pairs: List[Tuple[Block, Block]]) -> bool:
+        """Validate a run of (previous_block, current_block) pairs."""
+        for previous_block, current_block in pairs:
+            # Check if the hash is correct; blocks mined before the binary
+            # header scheme store sorted-JSON hashes, so accept either
+            if (current_block.hash != current_block.calculate_hash()
+                    and current_block.hash != current_block.calculate_legacy_hash()):
                 return False
 
             # Check if the previous hash reference is correct
@@ -100,25 +234,52 @@ class Blockchain:
 
         return True
 
+    def is_chain_valid(self, start: int = 0) -> bool:
+        """Validate the blockchain from the given block index onwards.
+
+        Runs against a snapshot of the chain, so validation never blocks
+        the miner thread and the miner never blocks validation. Callers
+        that have already validated a prefix can pass the index of the
+        last known-good block as start; its linkage to the next block is
+        still re-checked.
+        """
+        chain = self.chain
+        pairs = list(zip(chain[start:], chain[start + 1:]))
+        if len(pairs) < PARALLEL_VALIDATION_THRESHOLD:
+            return self._validate_pairs(pairs)
+
+        # hashlib releases the GIL, so re-hashing chunks of the chain in
+        # worker threads scales with the available cores.
+        workers = os.cpu_count() or 1
+        chunk_size = -(-len(pairs) // workers)
+        chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return all(executor.map(self._validate_pairs, chunks))
+
     def get_block_by_hash(self, hash_value: str) -> Block:
         """Get a block by its hash."""
-        for block in self.chain:
-            if block.hash == hash_value:
-                return block
-        return None
+        return self._hash_index.get(hash_value)
 
     def get_transactions_by_user(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all transactions for a specific user."""
         user_transactions = []
-        for block in self.chain:
-            for transaction in block.transactions:
-                if transaction.get("user_id") == user_id:
-                    transaction_copy = transaction.copy()
-                    transaction_copy["block_hash"] = block.hash
-                    transaction_copy["timestamp"] = block.timestamp
-                    user_transactions.append(transaction_copy)
+        for block, transaction in self._user_tx_index.get(user_id, ()):
+            transaction_copy = transaction.copy()
+            transaction_copy["block_hash"] = block.hash
+            transaction_copy["timestamp"] = block.timestamp
+            user_transactions.append(transaction_copy)
         return user_transactions
 
+    def get_transactions_by_document(self, document_hash: str) -> List[Dict[str, Any]]:
+        """Get all transactions referencing a specific document."""
+        document_transactions = []
+        for block, transaction in self._doc_tx_index.get(document_hash, ()):
+            transaction_copy = transaction.copy()
+            transaction_copy["block_hash"] = block.hash
+            transaction_copy["block_index"] = block.index
+            document_transactions.append(transaction_copy)
+        return document_transactions
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert blockchain to dictionary."""
         return {
@@ -134,13 +295,19 @@ class Blockchain:
         
         # Recreate the chain
         self.chain = []
+        self._user_tx_index = defaultdict(list)
+        self._doc_tx_index = defaultdict(list)
+        self._hash_index = {}
         for block_data in data.get("chain", []):
             block = Block(
                 index=block_data["index"],
                 timestamp=block_data["timestamp"],
-                transactions=block_data["transactions"],
-                previous_hash=block_data["previous_hash"]
+                transactions=[_intern_transaction(transaction)
+                              for transaction in block_data["transactions"]],
+                previous_hash=block_data["previous_hash"],
+                compute_hash=False
             )
             block.nonce = block_data["nonce"]
             block.hash = block_data["hash"]
-            self.chain.append(block)
\ No newline at end of file
+            self.chain.append(block)
+            self._index_block(block)
\ No newline at end of file
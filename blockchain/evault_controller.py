@@ -1,13 +1,16 @@
+import hashlib
 import time
 from typing import Dict, Any, List, Tuple, Optional
 import os
-import base64
 
 from blockchain.blockchain import Blockchain
 from blockchain.persistence import BlockchainPersistence
 from storage.document_storage import DocumentStorage
 from blockchain.auth import UserAuth
 
+# How long a validated session stays cached before re-checking the store
+SESSION_CACHE_TTL = 30.0
+
 class EVaultController:
     def __init__(self, storage_path: str = "storage"):
         self.storage_path = storage_path
@@ -15,6 +18,51 @@ class EVaultController:
         self.blockchain = self.blockchain_persistence.load_blockchain()
         self.document_storage = DocumentStorage(os.path.join(storage_path, "documents"))
         self.auth = UserAuth(storage_path)
+        self.last_mining_future = None
+        # Verified-prefix cache: blocks up to this index have already
+        # passed validation, identified by the hash seen at that index
+        self._verified_upto_index = 0
+        self._verified_hash = None
+        # Validated-session cache: sha256(token) -> (user_data, expiry).
+        # Only the digest is kept in memory, so a dump cannot be replayed
+        # as a live token.
+        self._session_cache = {}
+
+    def _resolve_session(self, session_token: str) -> Optional[Dict[str, Any]]:
+        """Resolve a session token to its user, caching hits briefly."""
+        digest = hashlib.sha256(session_token.encode()).digest()
+        now = time.time()
+        cached = self._session_cache.get(digest)
+        if cached and cached[1] > now:
+            return cached[0]
+
+        user_data = self.auth.get_user_by_session(session_token)
+        if user_data:
+            self._session_cache[digest] = (user_data, now + SESSION_CACHE_TTL)
+        else:
+            self._session_cache.pop(digest, None)
+        return user_data
+
+    def _mine_pending(self):
+        """Mine whatever is queued on the background worker.
+
+        The caller returns immediately; the mined chain is persisted from
+        the worker thread once proof-of-work completes.
+        """
+        future = self.blockchain.mine_pending_transactions_async(
+            on_mined=lambda block: self.blockchain_persistence.append_block(self.blockchain, block))
+        if future is not None:
+            self.last_mining_future = future
+        return future
+
+    def _commit_transaction(self, transaction: Dict[str, Any]):
+        """Queue a transaction and mine it on the background worker."""
+        self.blockchain.add_transaction(transaction)
+        return self._mine_pending()
+
+    def is_mining(self) -> bool:
+        """Check whether a block is still being mined in the background."""
+        return self.last_mining_future is not None and not self.last_mining_future.done()
 
     def register_user(self, username: str, password: str, email: str) -> Dict[str, Any]:
         """Register a new user."""
@@ -26,17 +74,19 @@ class EVaultController:
 
     def logout(self, session_token: str) -> bool:
         """Logout a user."""
+        self._session_cache.pop(
+            hashlib.sha256(session_token.encode()).digest(), None)
         return self.auth.logout(session_token)
 
     def get_user_by_session(self, session_token: str) -> Optional[Dict[str, Any]]:
         """Get user data by session token."""
-        return self.auth.get_user_by_session(session_token)
+        return self._resolve_session(session_token)
 
     def upload_document(self, session_token: str, document_name: str, 
                         document_content: bytes, document_type: str) -> Dict[str, Any]:
         """Upload a document to the vault."""
         # Verify user session
-        user_data = self.auth.get_user_by_session(session_token)
+        user_data = self._resolve_session(session_token)
         if not user_data:
             raise ValueError("Invalid session")
         
@@ -60,18 +110,84 @@ class EVaultController:
             "timestamp": time.time()
         }
         
-        self.blockchain.add_transaction(transaction)
-        self.blockchain.mine_pending_transactions()
-        
-        # Save blockchain state
-        self.blockchain_persistence.save_blockchain(self.blockchain)
+        self._commit_transaction(transaction)
         
         return document_metadata
 
+    def upload_document_stream(self, session_token: str, document_name: str,
+                               document_file, document_type: str) -> Dict[str, Any]:
+        """Upload a document to the vault from a file-like object.
+
+        Unlike upload_document, the content is streamed in chunks so the
+        whole file is never held in memory.
+        """
+        # Verify user session
+        user_data = self._resolve_session(session_token)
+        if not user_data:
+            raise ValueError("Invalid session")
+
+        user_id = user_data["user_id"]
+
+        # Store document
+        document_metadata = self.document_storage.store_document_stream(
+            user_id=user_id,
+            document_name=document_name,
+            document_file=document_file,
+            document_type=document_type
+        )
+
+        # Create blockchain transaction
+        transaction = {
+            "type": "document_upload",
+            "user_id": user_id,
+            "document_hash": document_metadata["hash"],
+            "document_name": document_name,
+            "document_type": document_type,
+            "timestamp": time.time()
+        }
+
+        self._commit_transaction(transaction)
+
+        return document_metadata
+
+    def upload_documents_batch(self, session_token: str,
+                               documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Upload several documents and mine them into a single block.
+
+        Each entry needs "name", "content" and "type" keys. Batching
+        amortizes one proof-of-work run and one persistence append across
+        the whole set instead of paying both per document.
+        """
+        # Verify user session
+        user_data = self._resolve_session(session_token)
+        if not user_data:
+            raise ValueError("Invalid session")
+
+        user_id = user_data["user_id"]
+
+        # Encryption of the batch fans out across processes; metadata and
+        # the chain are still committed serially below
+        metadata_list = self.document_storage.store_documents_parallel(
+            user_id, documents)
+        for document_metadata in metadata_list:
+            self.blockchain.add_transaction({
+                "type": "document_upload",
+                "user_id": user_id,
+                "document_hash": document_metadata["hash"],
+                "document_name": document_metadata["name"],
+                "document_type": document_metadata["type"],
+                "timestamp": time.time()
+            })
+
+        # One block, one disk append for the whole batch
+        self._mine_pending()
+
+        return metadata_list
+
     def get_document(self, session_token: str, document_hash: str) -> Tuple[bytes, Dict[str, Any]]:
         """Get a document from the vault."""
         # Verify user session
-        user_data = self.auth.get_user_by_session(session_token)
+        user_data = self._resolve_session(session_token)
         if not user_data:
             raise ValueError("Invalid session")
         
@@ -83,34 +199,58 @@ class EVaultController:
         # Verify document ownership
         if document_metadata["user_id"] != user_id:
             raise ValueError("Access denied")
-        
-        return document_content, document_metadata
 
-    def transfer_document(self, session_token: str, document_hash: str, 
-                          recipient_username: str) -> Dict[str, Any]:
-        """Transfer a document to another user."""
+        # Storage may hand back its decryption buffer as a bytearray;
+        # callers (e.g. st.download_button) expect real bytes
+        return bytes(document_content), document_metadata
+
+    def get_document_metadata(self, session_token: str, document_hash: str) -> Dict[str, Any]:
+        """Get a document's metadata without reading or decrypting its content."""
         # Verify user session
-        user_data = self.auth.get_user_by_session(session_token)
+        user_data = self._resolve_session(session_token)
         if not user_data:
             raise ValueError("Invalid session")
-        
+
         user_id = user_data["user_id"]
-        
+
+        document_metadata = self.document_storage.get_document_metadata(document_hash)
+
         # Verify document ownership
-        _, document_metadata = self.document_storage.retrieve_document(document_hash)
         if document_metadata["user_id"] != user_id:
             raise ValueError("Access denied")
-        
+
+        return document_metadata
+
+    def get_document_content(self, session_token: str, document_hash: str) -> bytes:
+        """Get a document's decrypted content bytes."""
+        document_content, _ = self.get_document(session_token, document_hash)
+        return document_content
+
+    def transfer_document(self, session_token: str, document_hash: str,
+                          recipient_username: str, rekey: bool = False) -> Dict[str, Any]:
+        """Transfer a document to another user.
+
+        The ciphertext stays valid for the recipient, so the default path
+        only reassigns ownership in the metadata store. Pass rekey=True to
+        decrypt and re-encrypt under a fresh key instead.
+        """
+        # Verify user session
+        user_data = self._resolve_session(session_token)
+        if not user_data:
+            raise ValueError("Invalid session")
+
+        user_id = user_data["user_id"]
+
+        # Verify document ownership
+        document_metadata = self.document_storage.get_document_metadata(document_hash)
+        if document_metadata["user_id"] != user_id:
+            raise ValueError("Access denied")
+
         # Verify recipient exists
-        recipient_user = None
-        for username, user_data in self.auth.users.items():
-            if username == recipient_username:
-                recipient_user = user_data
-                break
-        
+        recipient_user = self.auth.users.get(recipient_username)
         if not recipient_user:
             raise ValueError(f"Recipient user '{recipient_username}' not found")
-        
+
         # Create blockchain transaction
         transaction = {
             "type": "document_transfer",
@@ -120,32 +260,29 @@ class EVaultController:
             "document_name": document_metadata["name"],
             "timestamp": time.time()
         }
-        
+
         # Update document ownership
-        document_content, _ = self.document_storage.retrieve_document(document_hash)
-        
-        # Re-upload with new owner
-        new_document_metadata = self.document_storage.store_document(
-            user_id=recipient_user["user_id"],
-            document_name=document_metadata["name"],
-            document_content=document_content,
-            document_type=document_metadata["type"],
-            encryption_key=base64.b64decode(document_metadata["encryption_key"])
-        )
-        
+        if rekey:
+            document_content, _ = self.document_storage.retrieve_document(document_hash)
+            new_document_metadata = self.document_storage.store_document(
+                user_id=recipient_user["user_id"],
+                document_name=document_metadata["name"],
+                document_content=document_content,
+                document_type=document_metadata["type"]
+            )
+        else:
+            new_document_metadata = self.document_storage.reassign_owner(
+                document_hash, recipient_user["user_id"])
+
         # Add transaction to blockchain
-        self.blockchain.add_transaction(transaction)
-        self.blockchain.mine_pending_transactions()
-        
-        # Save blockchain state
-        self.blockchain_persistence.save_blockchain(self.blockchain)
-        
+        self._commit_transaction(transaction)
+
         return new_document_metadata
 
     def get_user_documents(self, session_token: str) -> Dict[str, Dict[str, Any]]:
         """Get all documents for the current user."""
         # Verify user session
-        user_data = self.auth.get_user_by_session(session_token)
+        user_data = self._resolve_session(session_token)
         if not user_data:
             raise ValueError("Invalid session")
         
@@ -157,26 +294,17 @@ class EVaultController:
     def get_document_history(self, session_token: str, document_hash: str) -> List[Dict[str, Any]]:
         """Get the transaction history for a document."""
         # Verify user session
-        user_data = self.auth.get_user_by_session(session_token)
+        user_data = self._resolve_session(session_token)
         if not user_data:
             raise ValueError("Invalid session")
         
-        # Get document history from blockchain
-        document_history = []
-        for block in self.blockchain.chain:
-            for transaction in block.transactions:
-                if transaction.get("document_hash") == document_hash:
-                    transaction_copy = transaction.copy()
-                    transaction_copy["block_hash"] = block.hash
-                    transaction_copy["block_index"] = block.index
-                    document_history.append(transaction_copy)
-        
-        return document_history
+        # Get document history from the blockchain's document index
+        return self.blockchain.get_transactions_by_document(document_hash)
 
     def get_user_transactions(self, session_token: str) -> List[Dict[str, Any]]:
         """Get all transactions for the current user."""
         # Verify user session
-        user_data = self.auth.get_user_by_session(session_token)
+        user_data = self._resolve_session(session_token)
         if not user_data:
             raise ValueError("Invalid session")
         
@@ -186,5 +314,22 @@ class EVaultController:
         return self.blockchain.get_transactions_by_user(user_id)
 
     def verify_blockchain(self) -> bool:
-        """Verify the integrity of the blockchain."""
-        return self.blockchain.is_chain_valid()
\ No newline at end of file
+        """Verify the integrity of the blockchain.
+
+        The chain is append-only, so blocks validated once stay valid;
+        each call only re-checks blocks appended since the last verified
+        tip, falling back to a full pass if the cached tip no longer
+        matches (e.g. after a reload).
+        """
+        chain = self.blockchain.chain
+        start = 0
+        if (self._verified_hash is not None
+                and self._verified_upto_index < len(chain)
+                and chain[self._verified_upto_index].hash == self._verified_hash):
+            start = self._verified_upto_index
+        valid = self.blockchain.is_chain_valid(start=start)
+        if valid:
+            tip = chain[-1]
+            self._verified_upto_index = tip.index
+            self._verified_hash = tip.hash
+        return valid
\ No newline at end of file
@@ -1,29 +1,101 @@
-import json
 import os
+
+import orjson
 from typing import Dict, Any
-from blockchain.blockchain import Blockchain
+from blockchain.blockchain import Block, Blockchain
 
 class BlockchainPersistence:
     def __init__(self, storage_path: str = "storage"):
         self.storage_path = storage_path
         self.blockchain_file = os.path.join(storage_path, "blockchain.json")
+        self.log_file = os.path.join(storage_path, "blockchain.jsonl")
+        self.meta_file = os.path.join(storage_path, "blockchain.meta.json")
         os.makedirs(storage_path, exist_ok=True)
 
+    def _replace_file(self, path: str, data: bytes) -> None:
+        """Atomically replace a file's content.
+
+        The data lands in a temporary file first and is renamed over the
+        target, so a crash mid-write leaves the old version intact instead
+        of a truncated file. The directory entry is fsynced so the rename
+        itself is durable.
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        dir_fd = os.open(self.storage_path, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
     def save_blockchain(self, blockchain: Blockchain) -> None:
-        """Save blockchain to file."""
-        blockchain_data = blockchain.to_dict()
-        with open(self.blockchain_file, 'w') as f:
-            json.dump(blockchain_data, f, indent=2)
+        """Rewrite the full block log and chain metadata.
+
+        Only needed to bootstrap the log or rebuild it; steady-state writes
+        go through append_block.
+        """
+        self._replace_file(
+            self.meta_file, orjson.dumps({"difficulty": blockchain.difficulty}))
+        self._replace_file(
+            self.log_file,
+            b''.join(orjson.dumps(block.to_dict()) + b'\n'
+                     for block in blockchain.chain))
+
+    def append_block(self, blockchain: Blockchain, block: Block) -> None:
+        """Append a single newly mined block to the block log.
+
+        O(1) in chain length, unlike rewriting the whole chain per mined
+        block.
+        """
+        if not os.path.exists(self.log_file):
+            # First write: lay down metadata and every block so far
+            self.save_blockchain(blockchain)
+            return
+
+        with open(self.log_file, 'ab') as f:
+            f.write(orjson.dumps(block.to_dict()) + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
 
     def load_blockchain(self) -> Blockchain:
-        """Load blockchain from file."""
+        """Load blockchain from the block log, or the legacy JSON file."""
         blockchain = Blockchain()
-        if os.path.exists(self.blockchain_file):
-            with open(self.blockchain_file, 'r') as f:
+        if os.path.exists(self.log_file):
+            data = {"chain": []}
+            if os.path.exists(self.meta_file):
+                with open(self.meta_file, 'rb') as f:
+                    try:
+                        data.update(orjson.loads(f.read()))
+                    except orjson.JSONDecodeError:
+                        pass
+            truncated = False
+            with open(self.log_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        data["chain"].append(orjson.loads(line))
+                    except orjson.JSONDecodeError:
+                        # A torn tail line (crash mid-append) only loses
+                        # that block; everything before it is intact
+                        truncated = True
+                        break
+            if data["chain"]:
+                blockchain.from_dict(data)
+            if truncated:
+                # Rewrite the log from the valid prefix so later appends
+                # don't land after the corrupt line and re-break the load
+                self.save_blockchain(blockchain)
+        elif os.path.exists(self.blockchain_file):
+            with open(self.blockchain_file, 'rb') as f:
                 try:
-                    blockchain_data = json.load(f)
+                    blockchain_data = orjson.loads(f.read())
                     blockchain.from_dict(blockchain_data)
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     # If the file is corrupted, start with a new blockchain
                     pass
-        return blockchain
\ No newline at end of file
+        return blockchain
@@ -1,125 +1,390 @@
 import os
 import hashlib
-import json
+import mmap
+import ssl
+import sqlite3
+import tempfile
 import time
-from typing import Dict, Any, Tuple
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple, BinaryIO
+import orjson
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
-from Crypto.Util.Padding import pad, unpad
+from Crypto.Util.Padding import unpad
 import base64
 
+# Chunk size for streamed uploads (4 MB)
+STREAM_CHUNK_SIZE = 1 << 22
+
+# Slice size for the fused hash+encrypt pass over in-memory content (64 KB)
+HASH_CHUNK_SIZE = 1 << 16
+
+def _probe_sha256():
+    """Select the SHA-256 factory, preferring the OpenSSL-backed one.
+
+    hashlib delegates to OpenSSL, which dispatches to SHA-NI or ARMv8
+    crypto instructions when the CPU has them; that is the fast path for
+    both document hashing and block mining. Interpreters whose OpenSSL
+    cannot provide sha256 (e.g. restricted FIPS providers) fall back to
+    PyCryptodome's C implementation, which carries its own intrinsics.
+    """
+    try:
+        hashlib.new("sha256", usedforsecurity=True)
+        return hashlib.sha256, "openssl (%s)" % ssl.OPENSSL_VERSION
+    except (ValueError, TypeError):
+        from Crypto.Hash import SHA256
+        return SHA256.new, "pycryptodome"
+
+sha256, SHA256_BACKEND = _probe_sha256()
+
+def _document_path(storage_path: str, document_hash: str) -> str:
+    """Build the sharded on-disk path for a document's ciphertext.
+
+    Files fan out into two levels of hash-prefix directories so no single
+    directory grows past a few hundred entries; flat directories with many
+    thousands of files degrade lookup and listing on most filesystems.
+    """
+    return os.path.join(storage_path, document_hash[:2],
+                        document_hash[2:4], document_hash)
+
+def _encrypt_and_write(storage_path: str, user_id: str, document_name: str,
+                       document_content: bytes, document_type: str,
+                       encryption_key: bytes = None) -> Dict[str, Any]:
+    """Hash, encrypt and write one document, returning its metadata.
+
+    Module-level so ProcessPoolExecutor can pickle it; it runs in worker
+    processes for batch uploads and therefore must not touch the metadata
+    database, which the parent commits to afterwards.
+    """
+    if encryption_key is None:
+        encryption_key = get_random_bytes(32)
+
+    # Hash and encrypt in one pass over the content: the workload is
+    # memory-bound, so feeding each slice to both kernels halves the
+    # traffic compared to two separate walks
+    hasher = sha256()
+    cipher = AES.new(encryption_key, AES.MODE_GCM)
+    nonce = cipher.nonce
+    encrypted_parts = []
+    content_view = memoryview(document_content)
+    for i in range(0, len(content_view), HASH_CHUNK_SIZE):
+        chunk = content_view[i:i + HASH_CHUNK_SIZE]
+        hasher.update(chunk)
+        encrypted_parts.append(cipher.encrypt(chunk))
+    tag = cipher.digest()
+    document_hash = hasher.hexdigest()
+    encrypted_content = b"".join(encrypted_parts)
+
+    document_metadata = {
+        "user_id": user_id,
+        "name": document_name,
+        "type": document_type,
+        "hash": document_hash,
+        "size": len(document_content),
+        "created_at": time.time(),
+        "nonce": base64.b64encode(nonce).decode("utf-8"),
+        "tag": base64.b64encode(tag).decode("utf-8"),
+        "encryption_key": base64.b64encode(encryption_key).decode("utf-8"),
+    }
+
+    document_path = _document_path(storage_path, document_hash)
+    os.makedirs(os.path.dirname(document_path), exist_ok=True)
+    DocumentStorage._write_file(document_path, encrypted_content)
+
+    return document_metadata
+
 class DocumentStorage:
     def __init__(self, storage_path: str = "storage/documents"):
         self.storage_path = storage_path
         os.makedirs(storage_path, exist_ok=True)
         self.metadata_file = os.path.join(storage_path, "metadata.json")
+        self.db_file = os.path.join(storage_path, "metadata.sqlite")
+        self._db = self._open_db()
         self.metadata = self._load_metadata()
+        self._by_user = defaultdict(set)
+        # Read-path cache: hash -> (key, nonce-or-iv, tag, path) with the
+        # base64 fields already decoded, so retrieval skips the per-read
+        # decode and dict walking. tag is None for legacy CBC documents.
+        self._fast_meta = {}
+        for doc_hash, document_metadata in self.metadata.items():
+            self._by_user[document_metadata["user_id"]].add(doc_hash)
+            self._fast_meta[doc_hash] = self._decode_fast_meta(doc_hash, document_metadata)
+
+    def _open_db(self) -> sqlite3.Connection:
+        """Open the metadata database, creating tables if needed."""
+        db = sqlite3.connect(self.db_file, isolation_level=None,
+                             check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS documents "
+                   "(hash TEXT PRIMARY KEY, user_id TEXT, data TEXT)")
+        db.execute("CREATE INDEX IF NOT EXISTS documents_user "
+                   "ON documents(user_id)")
+        return db
 
     def _load_metadata(self) -> Dict[str, Any]:
-        """Load metadata from file."""
+        """Load metadata from the database, migrating any legacy JSON file."""
+        rows = self._db.execute("SELECT hash, data FROM documents").fetchall()
+        if rows:
+            return {doc_hash: orjson.loads(data) for doc_hash, data in rows}
+
+        # One-time migration from the old metadata.json format
         if os.path.exists(self.metadata_file):
-            with open(self.metadata_file, 'r') as f:
-                return json.load(f)
+            with open(self.metadata_file, 'rb') as f:
+                metadata = orjson.loads(f.read())
+            self._db.executemany(
+                "INSERT OR REPLACE INTO documents (hash, user_id, data) "
+                "VALUES (?, ?, ?)",
+                [(doc_hash, data["user_id"], orjson.dumps(data).decode())
+                 for doc_hash, data in metadata.items()])
+            return metadata
         return {}
 
-    def _save_metadata(self) -> None:
-        """Save metadata to file."""
-        with open(self.metadata_file, 'w') as f:
-            json.dump(self.metadata, f, indent=2)
+    def _save_document_metadata(self, document_hash: str,
+                                document_metadata: Dict[str, Any]) -> None:
+        """Persist a single document's metadata row."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO documents (hash, user_id, data) "
+            "VALUES (?, ?, ?)",
+            (document_hash, document_metadata["user_id"],
+             orjson.dumps(document_metadata).decode()))
+
+    def _decode_fast_meta(self, document_hash: str,
+                          document_metadata: Dict[str, Any]) -> Tuple[bytes, bytes, bytes, str]:
+        """Decode a document's crypto fields and resolve its file path."""
+        key = base64.b64decode(document_metadata["encryption_key"])
+        document_path = _document_path(self.storage_path, document_hash)
+        if not os.path.exists(document_path):
+            # Documents stored before sharding live flat in storage_path
+            legacy_path = os.path.join(self.storage_path, document_hash)
+            if os.path.exists(legacy_path):
+                document_path = legacy_path
+        if "nonce" in document_metadata:
+            return (key, base64.b64decode(document_metadata["nonce"]),
+                    base64.b64decode(document_metadata["tag"]), document_path)
+        # Documents stored before the switch to AES-GCM
+        return (key, base64.b64decode(document_metadata["iv"]), None, document_path)
+
+    @staticmethod
+    def _write_file(path: str, data) -> None:
+        """Write a file's full content with one write call and one fsync.
 
-    def _generate_document_hash(self, content: bytes) -> str:
-        """Generate a hash for the document content."""
-        return hashlib.sha256(content).hexdigest()
+        The ciphertext must be durable before the metadata that references
+        it, otherwise a crash can leave metadata pointing at a missing or
+        partial document.
+        """
+        with open(path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
 
-    def _encrypt_document(self, content: bytes, key: bytes) -> Tuple[bytes, bytes]:
-        """Encrypt document content using AES."""
-        cipher = AES.new(key, AES.MODE_CBC)
-        ct_bytes = cipher.encrypt(pad(content, AES.block_size))
-        iv = cipher.iv
-        return ct_bytes, iv
+    def _decrypt_document(self, encrypted_content: bytes, key: bytes,
+                          nonce: bytes, tag: bytes) -> bytearray:
+        """Decrypt and authenticate document content using AES-GCM.
 
-    def _decrypt_document(self, encrypted_content: bytes, key: bytes, iv: bytes) -> bytes:
-        """Decrypt document content using AES."""
+        The cipher writes plaintext straight into a preallocated buffer
+        instead of returning a fresh bytes object, halving peak memory on
+        large documents. The buffer is returned as-is; callers only need
+        bytes-like content.
+        """
+        cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+        plaintext = bytearray(len(encrypted_content))
+        cipher.decrypt(encrypted_content, output=plaintext)
+        cipher.verify(tag)
+        return plaintext
+
+    def _decrypt_document_cbc(self, encrypted_content: bytes, key: bytes,
+                              iv: bytes) -> bytes:
+        """Decrypt documents stored under the legacy AES-CBC format."""
         cipher = AES.new(key, AES.MODE_CBC, iv)
-        pt = unpad(cipher.decrypt(encrypted_content), AES.block_size)
-        return pt
+        return unpad(cipher.decrypt(encrypted_content), AES.block_size)
+
+    def _commit_document(self, document_metadata: Dict[str, Any]) -> None:
+        """Record a stored document in the in-memory maps and the database."""
+        document_hash = document_metadata["hash"]
+        self.metadata[document_hash] = document_metadata
+        self._by_user[document_metadata["user_id"]].add(document_hash)
+        self._fast_meta[document_hash] = self._decode_fast_meta(
+            document_hash, document_metadata)
+        self._save_document_metadata(document_hash, document_metadata)
 
     def store_document(self, user_id: str, document_name: str, 
                        document_content: bytes, document_type: str, 
                        encryption_key: bytes = None) -> Dict[str, Any]:
         """Store a document and return its metadata."""
+        document_metadata = _encrypt_and_write(
+            self.storage_path, user_id, document_name,
+            document_content, document_type, encryption_key)
+        self._commit_document(document_metadata)
+        return document_metadata
+
+    def store_documents_parallel(self, user_id: str,
+                                 documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store a batch of documents, encrypting them across processes.
+
+        Each entry needs "name", "content" and "type" keys. The per-document
+        hash+encrypt+write work is independent, so it fans out to one worker
+        process per core; metadata is then committed serially on the parent,
+        keeping the database single-writer.
+        """
+        if len(documents) < 2:
+            return [self.store_document(user_id, document["name"],
+                                        document["content"], document["type"])
+                    for document in documents]
+
+        workers = min(os.cpu_count() or 1, len(documents))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            metadata_list = list(executor.map(
+                _encrypt_and_write,
+                (self.storage_path for _ in documents),
+                (user_id for _ in documents),
+                (document["name"] for document in documents),
+                (document["content"] for document in documents),
+                (document["type"] for document in documents)))
+
+        for document_metadata in metadata_list:
+            self._commit_document(document_metadata)
+        return metadata_list
+
+    def store_document_stream(self, user_id: str, document_name: str,
+                              document_file: BinaryIO, document_type: str,
+                              encryption_key: bytes = None) -> Dict[str, Any]:
+        """Store a document from a file-like object without loading it fully.
+
+        The file is read in fixed-size chunks; each chunk is fed to an
+        incremental SHA-256 and encrypted straight to a temporary file, so
+        memory use is bounded by the chunk size instead of the file size.
+        """
         if encryption_key is None:
             encryption_key = get_random_bytes(32)
-            
-        # Generate document hash
-        document_hash = self._generate_document_hash(document_content)
-        
-        # Encrypt document
-        encrypted_content, iv = self._encrypt_document(document_content, encryption_key)
-        
+
+        hasher = sha256()
+        cipher = AES.new(encryption_key, AES.MODE_GCM)
+        document_size = 0
+
+        tmp_file = tempfile.NamedTemporaryFile(dir=self.storage_path, delete=False)
+        try:
+            # GCM is a stream mode, so chunks encrypt without block alignment
+            while chunk := document_file.read(STREAM_CHUNK_SIZE):
+                hasher.update(chunk)
+                document_size += len(chunk)
+                tmp_file.write(cipher.encrypt(chunk))
+            tag = cipher.digest()
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+            tmp_file.close()
+
+            document_hash = hasher.hexdigest()
+            document_path = _document_path(self.storage_path, document_hash)
+            os.makedirs(os.path.dirname(document_path), exist_ok=True)
+            os.replace(tmp_file.name, document_path)
+        except Exception:
+            tmp_file.close()
+            if os.path.exists(tmp_file.name):
+                os.remove(tmp_file.name)
+            raise
+
         # Create document metadata
         document_metadata = {
             "user_id": user_id,
             "name": document_name,
             "type": document_type,
             "hash": document_hash,
-            "size": len(document_content),
+            "size": document_size,
             "created_at": time.time(),
-            "iv": base64.b64encode(iv).decode("utf-8"),
+            "nonce": base64.b64encode(cipher.nonce).decode("utf-8"),
+            "tag": base64.b64encode(tag).decode("utf-8"),
             "encryption_key": base64.b64encode(encryption_key).decode("utf-8"),
         }
-        
-        # Save encrypted document
-        document_path = os.path.join(self.storage_path, document_hash)
-        with open(document_path, 'wb') as f:
-            f.write(encrypted_content)
-        
-        # Update metadata
-        self.metadata[document_hash] = document_metadata
-        self._save_metadata()
-        
+
+        self._commit_document(document_metadata)
+
         return document_metadata
 
+    def get_document_metadata(self, document_hash: str) -> Dict[str, Any]:
+        """Get a document's metadata without touching the content file."""
+        if document_hash not in self.metadata:
+            raise ValueError(f"Document with hash {document_hash} not found")
+        return self.metadata[document_hash]
+
     def retrieve_document(self, document_hash: str) -> Tuple[bytes, Dict[str, Any]]:
         """Retrieve a document by its hash."""
         if document_hash not in self.metadata:
             raise ValueError(f"Document with hash {document_hash} not found")
         
         document_metadata = self.metadata[document_hash]
-        document_path = os.path.join(self.storage_path, document_hash)
-        
+        encryption_key, nonce_or_iv, tag, document_path = self._fast_meta[document_hash]
+
         if not os.path.exists(document_path):
             raise ValueError(f"Document file not found for hash {document_hash}")
-        
-        # Read encrypted content
+
+        # Decrypt straight out of the page cache: the cipher reads the
+        # mapping through the buffer protocol, so the ciphertext never
+        # gets copied into a Python bytes object first
         with open(document_path, 'rb') as f:
-            encrypted_content = f.read()
-        
-        # Decrypt document
-        iv = base64.b64decode(document_metadata["iv"])
-        encryption_key = base64.b64decode(document_metadata["encryption_key"])
-        decrypted_content = self._decrypt_document(encrypted_content, encryption_key, iv)
-        
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as encrypted_map:
+                    # The cipher wants a buffer object, not the raw mmap.
+                    # Release the view explicitly so the mapping can close
+                    # even when decryption raises (the traceback would
+                    # otherwise keep the exported buffer alive).
+                    encrypted_view = memoryview(encrypted_map)
+                    try:
+                        decrypted_content = self._decrypt_fast(
+                            encrypted_view, encryption_key, nonce_or_iv, tag)
+                    finally:
+                        encrypted_view.release()
+            else:
+                # mmap cannot map empty files
+                decrypted_content = self._decrypt_fast(
+                    b"", encryption_key, nonce_or_iv, tag)
+
         return decrypted_content, document_metadata
 
+    def _decrypt_fast(self, encrypted_content, encryption_key: bytes,
+                      nonce_or_iv: bytes, tag) -> bytes:
+        """Decrypt ciphertext using pre-decoded crypto fields."""
+        if tag is not None:
+            return self._decrypt_document(
+                encrypted_content, encryption_key, nonce_or_iv, tag)
+        return self._decrypt_document_cbc(
+            encrypted_content, encryption_key, nonce_or_iv)
+
+    def reassign_owner(self, document_hash: str, new_user_id: str) -> Dict[str, Any]:
+        """Change a document's owner without touching the content file.
+
+        The ciphertext and key are unchanged, so a transfer is a single
+        metadata update instead of a decrypt/re-encrypt cycle.
+        """
+        if document_hash not in self.metadata:
+            raise ValueError(f"Document with hash {document_hash} not found")
+
+        document_metadata = self.metadata[document_hash]
+        self._by_user[document_metadata["user_id"]].discard(document_hash)
+        document_metadata["user_id"] = new_user_id
+        self._by_user[new_user_id].add(document_hash)
+        self._save_document_metadata(document_hash, document_metadata)
+
+        return document_metadata
+
     def delete_document(self, document_hash: str) -> bool:
         """Delete a document by its hash."""
         if document_hash not in self.metadata:
             return False
         
-        document_path = os.path.join(self.storage_path, document_hash)
+        document_path = self._fast_meta[document_hash][3]
         if os.path.exists(document_path):
             os.remove(document_path)
         
+        self._by_user[self.metadata[document_hash]["user_id"]].discard(document_hash)
         del self.metadata[document_hash]
-        self._save_metadata()
+        self._fast_meta.pop(document_hash, None)
+        self._db.execute("DELETE FROM documents WHERE hash = ?", (document_hash,))
         
         return True
 
     def get_user_documents(self, user_id: str) -> Dict[str, Dict[str, Any]]:
         """Get all documents for a specific user."""
-        user_documents = {}
-        for doc_hash, metadata in self.metadata.items():
-            if metadata.get("user_id") == user_id:
-                user_documents[doc_hash] = metadata
-        return user_documents
\ No newline at end of file
+        return {doc_hash: self.metadata[doc_hash]
+                for doc_hash in self._by_user.get(user_id, ())}
\ No newline at end of file